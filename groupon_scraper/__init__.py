@@ -5,14 +5,36 @@ handlers live in their own modules for readability and testability.
 """
 
 import logging
+import os
 from fastapi import FastAPI
 
 from . import routes
-from .playwright_manager import lifespan
+from .worker_pool import lifespan
 
 
 app = FastAPI(lifespan=lifespan, redirect_slashes=False)
 app.include_router(routes.router)
 
 logger = logging.getLogger("app")
-logging.basicConfig(level=logging.INFO)
+
+
+def _log_level(name: str) -> int | None:
+    """Map a LOG_LEVEL value (uvicorn's names) to a stdlib level.
+
+    "trace" has no stdlib equivalent and maps to DEBUG; unknown names
+    return None.
+    """
+    name = name.upper()
+    if name == "TRACE":
+        return logging.DEBUG
+    level = logging.getLevelName(name)
+    return level if isinstance(level, int) else None
+
+
+# The only basicConfig call: modules just create named loggers. Worker
+# processes import this package too, so they share the configuration.
+_LOG_LEVEL = os.getenv("LOG_LEVEL", "info")
+_level = _log_level(_LOG_LEVEL)
+logging.basicConfig(level=logging.INFO if _level is None else _level)
+if _level is None:
+    logger.warning("Unknown LOG_LEVEL %r, using info", _LOG_LEVEL)
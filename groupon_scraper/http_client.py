@@ -0,0 +1,135 @@
+"""Browserless fast path for simple searches.
+
+Groupon server-renders the deal grid for plain queries, including each
+deal's `data-bhd` JSON payload. Fetching the search page with a plain
+HTTP client (reusing the cookies from the warm storage state) avoids a
+renderer entirely; callers fall back to Playwright whenever the payload
+is missing, e.g. when an anti-bot challenge is served instead.
+"""
+
+import html
+import logging
+import os
+import re
+from typing import Optional
+
+import httpx
+import orjson
+
+from .playwright_manager import STORAGE_STATE_PATH, get_device_descriptor
+from .scraper import build_search_url, project_deal
+
+# Set to 0 to always scrape with the browser
+HTTP_FAST_PATH = os.getenv("HTTP_FAST_PATH", "1") != "0"
+HTTP_TIMEOUT_S = 10.0
+
+# Used only when no in-process browser provides the "Desktop Chrome"
+# descriptor (i.e. when scraping runs in worker processes)
+FALLBACK_USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/140.0.0.0 Safari/537.36"
+)
+HEADERS = {
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.9",
+}
+
+DEAL_GRID_MARKER = 'data-testid="deal-grid"'
+EMPTY_DEALS_MARKER = 'data-bhw="EmptyDealList"'
+DEAL_PAYLOAD_RE = re.compile(r'data-bhd="([^"]+)"')
+
+logger = logging.getLogger("app.http")
+
+_client: Optional[httpx.AsyncClient] = None
+# mtime of the storage state the client's cookies were loaded from
+_cookies_mtime: Optional[float] = None
+
+
+def _load_cookies(client: httpx.AsyncClient) -> None:
+    """(Re)load cookies from the storage state file if it changed."""
+    global _cookies_mtime
+    try:
+        mtime = os.path.getmtime(STORAGE_STATE_PATH)
+    except OSError:
+        return
+    if mtime == _cookies_mtime:
+        return
+
+    try:
+        with open(STORAGE_STATE_PATH, "rb") as f:
+            state = orjson.loads(f.read())
+    except (OSError, orjson.JSONDecodeError) as e:
+        logger.warning("Failed to read storage state for HTTP client: %s", e)
+        return
+
+    client.cookies.clear()
+    for cookie in state.get("cookies", []):
+        client.cookies.set(
+            cookie["name"],
+            cookie["value"],
+            domain=cookie.get("domain", ""),
+            path=cookie.get("path", "/"),
+        )
+    _cookies_mtime = mtime
+
+
+def get_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None:
+        # Match the user agent the warm storage state was captured with
+        user_agent = get_device_descriptor().get("user_agent", FALLBACK_USER_AGENT)
+        _client = httpx.AsyncClient(
+            http2=True,
+            timeout=HTTP_TIMEOUT_S,
+            headers={**HEADERS, "User-Agent": user_agent},
+            follow_redirects=True,
+        )
+    _load_cookies(_client)
+    return _client
+
+
+async def close_client() -> None:
+    global _client, _cookies_mtime
+    if _client is not None:
+        try:
+            await _client.aclose()
+        except Exception as e:
+            logger.warning("Exception while closing HTTP client: %s", e)
+    _client = None
+    _cookies_mtime = None
+
+
+async def fetch_first_deal(query: str) -> Optional[dict]:
+    """Return the first deal's summary from the server-rendered page.
+
+    Like the browser's extraction script, returns `{"empty": True}` when
+    Groupon shows its empty-results list. Returns None whenever the page
+    cannot be used (request error, non-200 response, no deal payload), so
+    the caller should fall back to the browser.
+    """
+    if not HTTP_FAST_PATH:
+        return None
+
+    try:
+        response = await get_client().get(build_search_url(query))
+    except httpx.HTTPError as e:
+        logger.debug("HTTP fast path request failed: %s", e)
+        return None
+    if response.status_code != 200:
+        logger.debug("HTTP fast path got status %d", response.status_code)
+        return None
+
+    text = response.text
+    if EMPTY_DEALS_MARKER in text:
+        return {"empty": True}
+    grid_start = text.find(DEAL_GRID_MARKER)
+    match = DEAL_PAYLOAD_RE.search(text, grid_start) if grid_start != -1 else None
+    if match is None:
+        logger.debug("HTTP fast path found no deal payload")
+        return None
+
+    try:
+        return project_deal(orjson.loads(html.unescape(match.group(1))))
+    except (orjson.JSONDecodeError, KeyError, TypeError) as e:
+        logger.debug("HTTP fast path could not parse deal payload: %s", e)
+        return None
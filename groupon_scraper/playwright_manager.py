@@ -5,12 +5,24 @@ helpers used by request handlers.
 """
 
 import asyncio
+import json
 import logging
 import os
-from typing import Optional
+import time
+from typing import AsyncIterator, Optional
 from contextlib import asynccontextmanager
+from urllib.parse import urlsplit
 
-from playwright.async_api import Playwright, Browser, async_playwright
+from playwright.async_api import (
+    Browser,
+    BrowserContext,
+    Page,
+    Playwright,
+    Route,
+    async_playwright,
+)
+
+from .scraper import SEARCH_INPUT_SELECTOR, add_overlay_handler
 
 logger = logging.getLogger("app.playwright")
 
@@ -20,11 +32,298 @@ MAX_CONCURRENT_PAGES = int(os.getenv("MAX_CONCURRENT_PAGES", "4"))
 # Headless mode can be toggled via env var (0 means headed)
 PLAYWRIGHT_HEADLESS = os.getenv("PLAYWRIGHT_HEADLESS", "1") != "0"
 
-# Use a bounded semaphore to avoid accidental growth of waiting tasks
+# Relaunch the browser after this many admitted requests to bound the
+# memory a long-lived browser accumulates (0 disables recycling).
+RECYCLE_EVERY = int(os.getenv("BROWSER_RECYCLE_EVERY", "500"))
+# How long a recycle waits for in-flight pages before giving up (seconds)
+RECYCLE_DRAIN_TIMEOUT_S = 120.0
+# Upper bound of the exponential backoff between failed relaunches (seconds)
+RELAUNCH_MAX_BACKOFF_S = 60.0
+
+# Chromium flags that trim renderer/GPU memory and background network
+# activity; image decoding is disabled on top of the route-level blocking.
+# `--no-zygote` relies on Playwright's default of running without sandbox.
+CHROMIUM_ARGS = [
+    "--disable-dev-shm-usage",
+    "--disable-gpu",
+    "--no-zygote",
+    "--disable-features=Translate,site-per-process",
+    "--disable-background-networking",
+    "--disable-sync",
+    "--disable-default-apps",
+    "--blink-settings=imagesEnabled=false",
+]
+
+# Number of requests a pooled context (and its page) serves before it is
+# closed and replaced; bounds the per-context memory growth in the driver.
+CONTEXT_MAX_USES = max(1, int(os.getenv("CONTEXT_MAX_USES", "50")))
+
+# Cookies/localStorage captured from a warm-up visit and loaded into every
+# context, so Groupon's first-visit banners, geo prompts and bucketing
+# redirects are not replayed per context. Refreshed once it is older than
+# STORAGE_STATE_MAX_AGE_S (default: one week).
+STORAGE_STATE_PATH = os.getenv("STORAGE_STATE_PATH", "state.json")
+STORAGE_STATE_MAX_AGE_S = float(os.getenv("STORAGE_STATE_MAX_AGE_S", "604800"))
+WARMUP_URL = "https://www.groupon.com/"
+WARMUP_TIMEOUT_MS = 30000
+
+# Resource types that are never needed to render the deal grid. Aborting
+# them at the context level keeps bandwidth and renderer memory down.
+BLOCKED_RESOURCE_TYPES = frozenset({"image", "media", "font", "stylesheet"})
+# Third-party ad/analytics hosts that only add network chatter
+BLOCKED_HOSTS = (
+    "google-analytics.com",
+    "googletagmanager.com",
+    "doubleclick.net",
+    "facebook.net",
+    "hotjar.com",
+    "optimizely.com",
+)
+
 _playwright: Optional[Playwright] = None
 _browser: Optional[Browser] = None
-# Bounded semaphore to limit concurrent pages
-_semaphore = asyncio.BoundedSemaphore(MAX_CONCURRENT_PAGES)
+# Admission control: `_active` pages are in use out of at most `_c_max`.
+# Unlike a semaphore, the limit can be resized at runtime via `set_max`.
+_cond = asyncio.Condition()
+_active = 0
+_c_max = max(1, MAX_CONCURRENT_PAGES)
+# Set while waiting for in-flight pages to finish; blocks new admissions
+_draining = False
+# Requests admitted since startup; drives periodic browser recycling
+_request_count = 0
+_recycle_task: Optional[asyncio.Task] = None
+# Pool of (page, uses_left) pairs, one page per context. A `None` page is a
+# free slot whose context is created lazily on the next lease (e.g. after a
+# failed rebuild).
+_context_pool: Optional[asyncio.Queue[tuple[Optional[Page], int]]] = None
+_context_pool_size = 0
+# Background pool-entry rebuilds, kept referenced until they finish
+_rebuild_tasks: set[asyncio.Task] = set()
+# Background slot-release notifications, kept referenced until they finish
+_notify_tasks: set[asyncio.Task] = set()
+# Path passed as `storage_state` to new contexts, once a warm state exists
+_storage_state: Optional[str] = None
+# "Desktop Chrome" device descriptor, looked up once at startup
+_desktop_chrome: dict = {}
+
+
+class BrowserUnavailableError(RuntimeError):
+    """Raised when no browser (or context pool) is available to scrape."""
+
+
+async def _block_non_essential(route: Route) -> None:
+    """Abort requests that are not required to render search results."""
+    request = route.request
+    hostname = urlsplit(request.url).hostname or ""
+    if request.resource_type in BLOCKED_RESOURCE_TYPES or hostname.endswith(
+        BLOCKED_HOSTS
+    ):
+        await route.abort()
+    else:
+        await route.continue_()
+
+
+async def _new_context() -> BrowserContext:
+    """Create a browser context configured for scraping."""
+    global _storage_state
+    if _browser is None or _playwright is None:
+        raise BrowserUnavailableError("Browser not started")
+    try:
+        context = await _browser.new_context(
+            **_desktop_chrome,
+            storage_state=_storage_state,
+        )
+    except Exception as e:
+        if _storage_state is None:
+            raise
+        # An unreadable state must not break every context: drop it and
+        # start without one
+        context = await _browser.new_context(**_desktop_chrome)
+        logger.warning("Ignoring unusable storage state %s: %s", _storage_state, e)
+        _storage_state = None
+    # Register on the context (not the page) so the route table is
+    # released together with the context when it is recycled.
+    await context.route("**/*", _block_non_essential)
+    return context
+
+
+def _storage_state_is_fresh() -> bool:
+    """Whether the saved state is recent enough and parses."""
+    try:
+        age = time.time() - os.path.getmtime(STORAGE_STATE_PATH)
+        with open(STORAGE_STATE_PATH, encoding="utf-8") as f:
+            json.load(f)
+    except (OSError, ValueError):
+        return False
+    return age < STORAGE_STATE_MAX_AGE_S
+
+
+async def _warm_storage_state() -> None:
+    """Ensure a recent storage state exists on disk for new contexts.
+
+    A stale, missing or unreadable state is rebuilt by visiting the
+    homepage once.
+    Failures are logged and contexts simply start without a state.
+    """
+    global _storage_state
+    if _storage_state_is_fresh():
+        _storage_state = STORAGE_STATE_PATH
+        return
+
+    _storage_state = None
+    try:
+        context = await _new_context()
+    except Exception as e:
+        logger.warning("Failed to warm storage state: %s", e)
+        return
+    try:
+        page = await context.new_page()
+        await add_overlay_handler(page)
+        # Same readiness strategy as scraping: the DOM plus a known element,
+        # never `load`, which waits on Groupon's analytics beacons
+        await page.goto(
+            WARMUP_URL, wait_until="domcontentloaded", timeout=WARMUP_TIMEOUT_MS
+        )
+        await page.locator(SEARCH_INPUT_SELECTOR).wait_for(
+            state="attached", timeout=WARMUP_TIMEOUT_MS
+        )
+        # Write a temp file and rename it into place, so neither a kill
+        # mid-write nor workers warming up concurrently leave a partial file
+        tmp_path = f"{STORAGE_STATE_PATH}.{os.getpid()}.tmp"
+        try:
+            await context.storage_state(path=tmp_path)
+            os.replace(tmp_path, STORAGE_STATE_PATH)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+        _storage_state = STORAGE_STATE_PATH
+        logger.info("Saved warm storage state to %s", STORAGE_STATE_PATH)
+    except Exception as e:
+        logger.warning("Failed to warm storage state: %s", e)
+    finally:
+        await _close_context(context)
+
+
+async def _close_context(context: BrowserContext) -> None:
+    try:
+        await context.close()
+    except Exception:
+        logger.debug("Failed to close context cleanly")
+
+
+async def _new_pooled_page() -> Page:
+    """Create a context with a single long-lived page for the pool.
+
+    The overlay handler is registered here once instead of per request.
+    """
+    context = await _new_context()
+    try:
+        page = await context.new_page()
+        await add_overlay_handler(page)
+    except Exception:
+        await _close_context(context)
+        raise
+    return page
+
+
+async def _fill_context_pool() -> None:
+    """Pre-warm one context and page per allowed concurrent page."""
+    global _context_pool, _context_pool_size
+    _context_pool = asyncio.Queue()
+    _context_pool_size = _c_max
+    for _ in range(_context_pool_size):
+        try:
+            page: Optional[Page] = await _new_pooled_page()
+        except Exception as e:
+            logger.warning("Failed to pre-warm browser context: %s", e)
+            page = None
+        _context_pool.put_nowait((page, CONTEXT_MAX_USES))
+
+
+async def _drain_context_pool() -> None:
+    global _context_pool, _context_pool_size
+    if _context_pool is None:
+        return
+    while not _context_pool.empty():
+        page, _ = _context_pool.get_nowait()
+        if page is not None:
+            await _close_context(page.context)
+    _context_pool = None
+    _context_pool_size = 0
+
+
+async def _launch_browser() -> None:
+    """Launch the shared browser and pre-warm its context pool."""
+    global _browser
+    if _playwright is None:
+        raise RuntimeError("Playwright not started")
+    # headless controlled by environment variable for easier debugging.
+    # "chromium" is Playwright's bundled build (installed in the Docker
+    # image), not a system Chrome with its sync/updater background services.
+    _browser = await _playwright.chromium.launch(
+        channel="chromium", headless=PLAYWRIGHT_HEADLESS, args=CHROMIUM_ARGS
+    )
+    await _warm_storage_state()
+    await _fill_context_pool()
+
+
+async def _close_browser() -> None:
+    """Close the shared browser and its context pool, if any."""
+    global _browser
+    await _drain_context_pool()
+    if _browser is not None:
+        try:
+            await _browser.close()
+        except Exception as e:
+            logger.warning("Exception while closing browser: %s", e)
+        _browser = None
+
+
+async def _relaunch_with_backoff() -> None:
+    """Keep relaunching the browser until it starts.
+
+    Runs with admissions open: meanwhile browser-path requests get a 503.
+    """
+    delay = 1.0
+    while True:
+        logger.info("Retrying browser launch in %.0fs", delay)
+        await asyncio.sleep(delay)
+        try:
+            await _launch_browser()
+            logger.info("Browser relaunched")
+            return
+        except Exception as e:
+            logger.error("Failed to relaunch browser: %s", e)
+            await _close_browser()
+        delay = min(delay * 2, RELAUNCH_MAX_BACKOFF_S)
+
+
+async def _recycle_browser() -> None:
+    """Close and relaunch the shared browser once no pages are in use.
+
+    New admissions wait in `slot` until the fresh browser is ready. If the
+    relaunch fails, admissions reopen and it is retried with backoff.
+    """
+    try:
+        if not await _drain(timeout=RECYCLE_DRAIN_TIMEOUT_S):
+            logger.warning("Skipping browser recycle: active pages did not finish")
+            return
+
+        await _close_browser()
+        try:
+            await _launch_browser()
+            logger.info("Browser recycled after %d requests", _request_count)
+            return
+        except Exception as e:
+            logger.error("Failed to relaunch browser: %s", e)
+            await _close_browser()
+    finally:
+        await _resume()
+
+    await _relaunch_with_backoff()
 
 
 async def _ensure_startup() -> None:
@@ -32,21 +331,20 @@ async def _ensure_startup() -> None:
 
     Should be safe to call multiple times (no-op if already started).
     """
-    global _playwright, _browser
+    global _playwright, _browser, _context_pool, _desktop_chrome
     if _playwright is None:
         try:
             _playwright = await async_playwright().start()
+            _desktop_chrome = dict(_playwright.devices.get("Desktop Chrome", {}))
             # Launch a single browser instance shared across requests
-            # headless controlled by environment variable for easier debugging
-            _browser = await _playwright.chromium.launch(
-                channel="chromium", headless=PLAYWRIGHT_HEADLESS
-            )
+            await _launch_browser()
             logger.info("Playwright started and browser launched")
         except Exception as e:
             logger.exception("Failed to start Playwright: %s", e)
             # Ensure globals are reset on failure
             _playwright = None
             _browser = None
+            _context_pool = None
             raise
 
 
@@ -55,24 +353,27 @@ async def _shutdown() -> None:
 
     Shutdown may fail if the driver already exited; log and continue.
     """
-    global _playwright, _browser
-    # Try to wait briefly for in-flight page tasks to finish by acquiring
-    # all semaphore permits. This reduces TargetClosedError noise when
-    # the browser is closed while pages are still being used.
+    global _playwright, _browser, _context_pool
+    if _recycle_task is not None and not _recycle_task.done():
+        _recycle_task.cancel()
+        # Let its `_resume` run now, so it cannot reopen admissions after
+        # the drain below
+        try:
+            await _recycle_task
+        except asyncio.CancelledError:
+            pass
+
+    # Try to wait briefly for in-flight page tasks to finish while blocking
+    # new admissions. This reduces TargetClosedError noise when the browser
+    # is closed while pages are still being used.
     if _browser:
         try:
-            # Attempt to acquire all permits with a small total timeout.
-            total_permits = max(1, MAX_CONCURRENT_PAGES)
-            per_attempt = 5.0 / total_permits
-            for _ in range(total_permits):
-                try:
-                    await asyncio.wait_for(_semaphore.acquire(), timeout=per_attempt)
-                except asyncio.TimeoutError:
-                    logger.warning(
-                        "Timed out waiting for active pages to finish before shutdown"
-                    )
-                    break
+            if not await _drain(timeout=5.0):
+                logger.warning(
+                    "Timed out waiting for active pages to finish before shutdown"
+                )
 
+            await _drain_context_pool()
             await _browser.close()
         except Exception as e:
             logger.warning("Exception while closing browser during shutdown: %s", e)
@@ -83,6 +384,7 @@ async def _shutdown() -> None:
         except Exception as e:
             logger.warning("Exception while stopping Playwright during shutdown: %s", e)
 
+    _context_pool = None
     _browser = None
     _playwright = None
     logger.info("Playwright stopped")
@@ -105,5 +407,163 @@ def get_playwright() -> Optional[Playwright]:
     return _playwright
 
 
-def get_semaphore() -> asyncio.BoundedSemaphore:
-    return _semaphore
+def get_device_descriptor() -> dict:
+    return _desktop_chrome
+
+
+def is_recycling() -> bool:
+    """Whether a recycle is closing or relaunching the browser.
+
+    Admissions wait in `slot` meanwhile, so requests should queue rather
+    than fail fast.
+    """
+    return _draining and _recycle_task is not None and not _recycle_task.done()
+
+
+async def _drain(timeout: float) -> bool:
+    """Block new admissions and wait until no pages are in use.
+
+    Returns False if pages are still active once `timeout` expires.
+    """
+    global _draining
+    async with _cond:
+        _draining = True
+        try:
+            await asyncio.wait_for(
+                _cond.wait_for(lambda: _active == 0), timeout=timeout
+            )
+        except asyncio.TimeoutError:
+            return False
+    return True
+
+
+async def _resume() -> None:
+    """Re-open admissions after `_drain`."""
+    global _draining
+    async with _cond:
+        _draining = False
+        _cond.notify_all()
+
+
+@asynccontextmanager
+async def slot() -> AsyncIterator[None]:
+    """Hold one of the `_c_max` concurrent page slots.
+
+    Every `RECYCLE_EVERY` admissions a background browser recycle is
+    scheduled; it starts once the admitted pages have finished.
+    """
+    global _active, _request_count, _recycle_task
+    async with _cond:
+        await _cond.wait_for(lambda: not _draining and _active < _c_max)
+        _active += 1
+        _request_count += 1
+        if (
+            RECYCLE_EVERY > 0
+            and _request_count % RECYCLE_EVERY == 0
+            and (_recycle_task is None or _recycle_task.done())
+        ):
+            _recycle_task = asyncio.create_task(_recycle_browser())
+    try:
+        yield
+    finally:
+        # Release without awaiting: a cancel scope (e.g. sse-starlette on
+        # client disconnect) re-cancels every await, which would leak the
+        # slot if the lock were busy. Waiters are woken from a task.
+        _active -= 1
+        task = asyncio.create_task(_notify_release())
+        _notify_tasks.add(task)
+        task.add_done_callback(_notify_tasks.discard)
+
+
+async def _notify_release() -> None:
+    """Wake waiters after `slot` released a page."""
+    async with _cond:
+        # A drain waits on a different predicate; wake everyone so a
+        # single notification cannot be consumed by the wrong waiter.
+        if _draining:
+            _cond.notify_all()
+        else:
+            _cond.notify(1)
+
+
+async def set_max(n: int) -> None:
+    """Resize the concurrent page limit without a restart."""
+    global _c_max, _context_pool_size
+    n = max(1, n)
+    async with _cond:
+        raised = n > _c_max
+        _c_max = n
+        # Grow the context pool so new slots do not wait on a context;
+        # the extra contexts are created lazily on first lease.
+        if _context_pool is not None:
+            while _context_pool_size < n:
+                _context_pool.put_nowait((None, CONTEXT_MAX_USES))
+                _context_pool_size += 1
+        if raised:
+            _cond.notify_all()
+    logger.info("Concurrent page limit set to %d", n)
+
+
+@asynccontextmanager
+async def page_lease() -> AsyncIterator[Page]:
+    """Borrow a pooled page for the duration of one request.
+
+    The page stays open and is returned to the pool afterwards; its context
+    is closed and replaced once it has served `CONTEXT_MAX_USES` requests
+    or if the page was closed (e.g. the renderer crashed).
+
+    Nothing is awaited between taking an entry and handing it back (or to
+    a rebuild task), so a cancelled request cannot shrink the pool.
+    """
+    pool = _context_pool
+    if pool is None:
+        raise BrowserUnavailableError("Context pool not initialised")
+
+    page, uses_left = await pool.get()
+    if page is None or page.is_closed():
+        # Rebuild in the background and take whichever entry comes next
+        _rebuild_pooled_page(pool, page)
+        page, uses_left = await pool.get()
+        if page is None or page.is_closed():
+            _rebuild_pooled_page(pool, page)
+            raise BrowserUnavailableError("No usable browser context")
+
+    try:
+        yield page
+    finally:
+        uses_left -= 1
+        if uses_left <= 0 or page.is_closed():
+            _rebuild_pooled_page(pool, page)
+        else:
+            pool.put_nowait((page, uses_left))
+
+
+def _rebuild_pooled_page(
+    pool: asyncio.Queue[tuple[Optional[Page], int]], old_page: Optional[Page]
+) -> None:
+    """Replace a pool entry from a task of its own.
+
+    The task does not share the requester's cancellation, and always puts
+    an entry back into `pool` (`None` if no page could be built).
+    """
+    task = asyncio.create_task(_rebuild(pool, old_page))
+    _rebuild_tasks.add(task)
+    task.add_done_callback(_rebuild_tasks.discard)
+
+
+async def _rebuild(
+    pool: asyncio.Queue[tuple[Optional[Page], int]], old_page: Optional[Page]
+) -> None:
+    page: Optional[Page] = None
+    try:
+        if old_page is not None:
+            await _close_context(old_page.context)
+        page = await _new_pooled_page()
+    except Exception as e:
+        logger.warning("Failed to rebuild browser context: %s", e)
+    finally:
+        if _context_pool is pool:
+            pool.put_nowait((page, CONTEXT_MAX_USES))
+        elif page is not None:
+            # The pool was drained (recycle or shutdown) meanwhile
+            await _close_context(page.context)
@@ -1,21 +1,25 @@
 """HTTP route handlers (FastAPI APIRouter).
 
 Defines the `/search` and `/health` endpoints and delegates scraping to
-the `scraper` module while using the lifecycle helpers in
-`playwright_manager`.
+the `scraper` module, either in-process via the lifecycle helpers in
+`playwright_manager` or in a worker process (see `worker_pool`).
 """
 
 from fastapi import APIRouter, HTTPException, Query
-from typing import Optional
+from typing import AsyncIterator, Optional
 import logging
-from enum import Enum
 import os
 
+import orjson
 from fastapi.responses import PlainTextResponse
+from playwright.async_api import Error as PlaywrightError
 from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+from sse_starlette.sse import EventSourceResponse
 
-from .playwright_manager import get_browser, get_playwright, get_semaphore
-from .scraper import run
+from .http_client import fetch_first_deal
+from .playwright_manager import BrowserUnavailableError
+from .scraper import SortOption
+from .worker_pool import WorkerScrapeError, is_available, scrape, scrape_stream
 
 # Environment-configurable timeouts/retries for navigation
 GOTO_TIMEOUT_MS = int(os.getenv("PAGE_GOTO_TIMEOUT_MS", "60000"))
@@ -26,12 +30,22 @@ logger = logging.getLogger("app.routes")
 router = APIRouter()
 
 
-class SortOption(str, Enum):
-    relevance = "relevance"
-    price_asc = "price:asc"
-    price_desc = "price:desc"
-    distance = "distance"
-    rating = "rating"
+def _scrape_error(e: Exception) -> HTTPException:
+    """Log a scrape failure and map it to the HTTP error to report."""
+    if isinstance(e, BrowserUnavailableError):
+        # e.g. the browser is being relaunched after a failed recycle
+        logger.warning("Browser unavailable: %s", e)
+        return HTTPException(status_code=503, detail="Browser not available")
+    if isinstance(e, PlaywrightTimeoutError):
+        logger.error("Timeout: %s", e)
+        return HTTPException(status_code=504, detail="Timeout while scraping")
+    if isinstance(e, (PlaywrightError, WorkerScrapeError)):
+        # Expected failures (navigation errors, closed pages) need only the
+        # message; a worker has already logged its own traceback
+        logger.error("Scrape failed: %s", e)
+        return HTTPException(status_code=500, detail="Scrape error")
+    logger.exception("Scrape failed: %s", e)
+    return HTTPException(status_code=500, detail="Scrape error")
 
 
 @router.get("/search")
@@ -41,50 +55,92 @@ async def search(
     price_min: Optional[int] = Query(None, ge=0),
     price_max: Optional[int] = Query(None, ge=0),
 ):
-    browser = get_browser()
-    playwright = get_playwright()
-    if browser is None or playwright is None:
+    # FastAPI will coerce and validate `sort_option` to one of the
+    # SortOption enum values (or None). Convert to plain string for
+    # the scraper.run function which expects Optional[str].
+    sort_str = sort_option.value if sort_option is not None else None
+
+    # Filters are applied through the page UI, so only plain queries can be
+    # answered from the server-rendered HTML without a browser
+    if sort_str is None and not price_min and not price_max:
+        result = await fetch_first_deal(query)
+        if result is not None:
+            return {
+                "success": True,
+                "data": "No results found" if result.get("empty") else result,
+            }
+
+    if not is_available():
         raise HTTPException(status_code=503, detail="Browser not available")
 
-    # Limit concurrent page usage
-    async with get_semaphore():
-        context = await browser.new_context(
-            **playwright.devices.get("Desktop Chrome", {})
+    try:
+        # Concurrency is limited inside `scrape` (page slots in-process,
+        # or the number of idle worker processes)
+        result = await scrape(
+            query=query,
+            sort_option=sort_str,
+            price_min=price_min,
+            price_max=price_max,
+            goto_timeout_ms=GOTO_TIMEOUT_MS,
+            goto_retries=GOTO_RETRIES,
         )
-        page = await context.new_page()
-        try:
-            # FastAPI will coerce and validate `sort_option` to one of the
-            # SortOption enum values (or None). Convert to plain string for
-            # the scraper.run function which expects Optional[str].
-            sort_str = sort_option.value if sort_option is not None else None
 
-            result = await run(
-                page=page,
+        return {
+            "success": True,
+            "data": result or "No results found",
+        }
+
+    except Exception as e:
+        raise _scrape_error(e)
+
+
+@router.get("/search/stream")
+async def search_stream(
+    query: str = Query(..., min_length=1),
+    sort_option: Optional[SortOption] = None,
+    price_min: Optional[int] = Query(None, ge=0),
+    price_max: Optional[int] = Query(None, ge=0),
+):
+    """Server-sent events variant of `/search`.
+
+    Emits one `deal` event per parsed deal, then `end` (or `error` with the
+    same detail `/search` would return).
+    """
+    sort_str = sort_option.value if sort_option is not None else None
+    plain_query = sort_str is None and not price_min and not price_max
+    if not plain_query and not is_available():
+        raise HTTPException(status_code=503, detail="Browser not available")
+
+    async def events() -> AsyncIterator[dict]:
+        try:
+            if plain_query:
+                result = await fetch_first_deal(query)
+                if result is not None:
+                    if not result.get("empty"):
+                        yield {"event": "deal", "data": orjson.dumps(result).decode()}
+                    yield {"event": "end", "data": ""}
+                    return
+                if not is_available():
+                    raise HTTPException(
+                        status_code=503, detail="Browser not available"
+                    )
+
+            async for deal in scrape_stream(
                 query=query,
                 sort_option=sort_str,
                 price_min=price_min,
                 price_max=price_max,
                 goto_timeout_ms=GOTO_TIMEOUT_MS,
                 goto_retries=GOTO_RETRIES,
-            )
-
-            return {
-                "success": True,
-                "data": result or "No results found",
-            }
-
-        except PlaywrightTimeoutError as e:
-            logger.error("Timeout: %s", e)
-            raise HTTPException(status_code=504, detail="Timeout while scraping")
+            ):
+                yield {"event": "deal", "data": orjson.dumps(deal).decode()}
+            yield {"event": "end", "data": ""}
+        except HTTPException as e:
+            yield {"event": "error", "data": e.detail}
         except Exception as e:
-            logger.exception("Scrape failed: %s", e)
-            raise HTTPException(status_code=500, detail="Scrape error")
-        finally:
-            # always close context to free resources
-            try:
-                await context.close()
-            except Exception:
-                logger.debug("Failed to close context cleanly")
+            yield {"event": "error", "data": _scrape_error(e).detail}
+
+    return EventSourceResponse(events())
 
 
 @router.get("/", response_class=PlainTextResponse)
@@ -4,18 +4,120 @@ This module focuses on the page automation and extracting a brief
 summary from the loaded Groupon page.
 """
 
-from typing import Optional
-import json
+from typing import AsyncIterator, Optional
+from enum import Enum
 import os
 import asyncio
+from urllib.parse import urlencode
+
+from playwright.async_api import Locator, Page
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+SEARCH_URL = "https://www.groupon.com/search"
+
+# How long to wait for a readiness element to be attached. Kept well below
+# Playwright's 30 s default so a page that never renders it (bot challenge,
+# unexpected A/B variant) is detected early and re-navigated once.
+READY_TIMEOUT_MS = int(os.getenv("PAGE_READY_TIMEOUT_MS", "8000"))
+
+# DOM contracts with Groupon's pages, kept in one place.
+# Exit-banner modal Groupon shows on top of the page for new visitors
+OVERLAY_SELECTOR = '[data-bhc-path="ExitBannerModal|state:opened"] button'
+SEARCH_INPUT_SELECTOR = '[data-testid="search-input"]'
+SORT_BOX_SELECTOR = '[data-bhw="sort-filter-box"]'
+PRICE_INPUT_SELECTOR = '[data-testid="filter-section-price"] >> role=textbox'
+DEAL_GRID_SELECTOR = '[data-testid="deal-grid"]'
+EMPTY_DEALS_SELECTOR = '[data-bhw="EmptyDealList"]'
+# Either one signals that the search results have settled
+RESULTS_SELECTOR = f"{DEAL_GRID_SELECTOR}, {EMPTY_DEALS_SELECTOR}"
+
+
+# Sort orders accepted by the API; also the single source for their
+# selectors in the sort dropdown
+class SortOption(str, Enum):
+    relevance = "relevance"
+    price_asc = "price:asc"
+    price_desc = "price:desc"
+    distance = "distance"
+    rating = "rating"
+
+
+SORT_SELECTORS = {
+    option.value: f'[data-bhc="sort:{option.value}"]' for option in SortOption
+}
+
+# Reads the empty-results marker and projects the first deal's payload down
+# to the fields returned by the API in a single protocol round-trip, so only
+# a small record crosses into Python. Returns `{empty: true}` when Groupon
+# shows its empty-results list and `null` when no deal payload is present.
+# Called with `[DEAL_GRID_SELECTOR, EMPTY_DEALS_SELECTOR]`.
+EXTRACT_FIRST_DEAL_JS = """([gridSelector, emptySelector]) => {
+    if (document.querySelector(emptySelector) !== null) {
+        return {empty: true};
+    }
+    const a = document.querySelector(gridSelector + ' a');
+    const s = a ? a.getAttribute('data-bhd') : null;
+    if (!s) {
+        return null;
+    }
+    const body = JSON.parse(s).body;
+    const prices = body.section2.content;
+    return {
+        name: body.section1.content,
+        prices: {
+            list_price: prices.list_price,
+            sell_price: prices.sell_price,
+            discount: prices.discount,
+            isocode_currency: prices.isocode_currency,
+            currency_exponent: prices.currency_exponent,
+        },
+        supplier: body.section3.content,
+    };
+}"""
+
+
+def project_deal(info_dict: dict) -> dict:
+    """Reduce a `data-bhd` deal payload to the fields returned by the API.
+
+    Mirrors the projection done in `EXTRACT_FIRST_DEAL_JS`, for payloads
+    parsed outside the browser.
+    """
+    body = info_dict["body"]
+    prices = body["section2"]["content"]
+    return {
+        "name": body["section1"]["content"],
+        "prices": {
+            "list_price": prices["list_price"],
+            "sell_price": prices["sell_price"],
+            "discount": prices["discount"],
+            "isocode_currency": prices["isocode_currency"],
+            "currency_exponent": prices["currency_exponent"],
+        },
+        "supplier": body["section3"]["content"],
+    }
+
 
-from playwright.async_api import Page
+def build_search_url(query: str) -> str:
+    """Return the Groupon search results URL for `query`."""
+    return f"{SEARCH_URL}?{urlencode({'query': query})}"
+
+
+async def add_overlay_handler(page: Page) -> None:
+    """Dismiss the exit-banner modal whenever it blocks an action."""
+    await page.add_locator_handler(
+        page.locator(OVERLAY_SELECTOR),
+        lambda offer: offer.get_by_role("button").click(),
+    )
 
 
 async def goto(page: Page, url: str, timeout_ms: int, retries: int) -> None:
     """Navigate to a URL with retries and timeout."""
+    retries = max(1, retries)
     for attempt in range(retries):
         try:
+            # Only wait for the DOM: the default `load` (and `networkidle`)
+            # also waits on images and analytics beacons that Groupon keeps
+            # firing. Readiness is signalled by the locator waits in `run`.
             await page.goto(
                 url,
                 wait_until="domcontentloaded",
@@ -23,13 +125,31 @@ async def goto(page: Page, url: str, timeout_ms: int, retries: int) -> None:
             )
             return
         except Exception:
-            if attempt == 0:
+            if attempt < retries - 1:
                 # brief backoff before retrying
                 await asyncio.sleep(0.5)
                 continue
             raise
 
 
+async def goto_ready(
+    page: Page, url: str, ready_loc: Locator, timeout_ms: int, retries: int
+) -> None:
+    """Navigate to a URL and wait for `ready_loc` to be attached.
+
+    If it does not show up within `READY_TIMEOUT_MS`, the page is loaded
+    once more before giving up.
+    """
+    await goto(page, url, timeout_ms, retries)
+    try:
+        # "attached" avoids visibility polling; the DOM is all we read
+        await ready_loc.wait_for(state="attached", timeout=READY_TIMEOUT_MS)
+    except PlaywrightTimeoutError:
+        # A single re-navigation, not another round of goto retries
+        await goto(page, url, timeout_ms, retries=1)
+        await ready_loc.wait_for(state="attached", timeout=READY_TIMEOUT_MS)
+
+
 async def run(
     page: Page,
     query: str,
@@ -41,6 +161,40 @@ async def run(
 ) -> dict | None:
     """Perform a search on Groupon and return a brief summary dict.
 
+    Returns the first deal from `iter_deals`, or None if there is none.
+    """
+    deals = iter_deals(
+        page,
+        query,
+        sort_option=sort_option,
+        price_min=price_min,
+        price_max=price_max,
+        goto_timeout_ms=goto_timeout_ms,
+        goto_retries=goto_retries,
+    )
+    try:
+        return await anext(deals, None)
+    finally:
+        await deals.aclose()
+
+
+async def iter_deals(
+    page: Page,
+    query: str,
+    sort_option: Optional[str] = None,
+    price_min: Optional[int] = None,
+    price_max: Optional[int] = None,
+    goto_timeout_ms: int | None = None,
+    goto_retries: int | None = None,
+) -> AsyncIterator[dict]:
+    """Perform a search on Groupon and yield a brief summary dict per deal.
+
+    Only the first deal is extracted for now. Because this is a generator,
+    callers can already stream each deal as soon as it is parsed.
+
+    `page` is expected to come from the pool in `playwright_manager`, which
+    has already registered the overlay handler via `add_overlay_handler`.
+
     timeout and retries can be provided (in milliseconds / tries). If not
     provided, sensible defaults are used.
     """
@@ -50,26 +204,30 @@ async def run(
     if goto_retries is None:
         goto_retries = int(os.getenv("PAGE_GOTO_RETRIES", "2"))
 
-    # Locators
-    overlay_loc = page.locator('[data-bhc-path="ExitBannerModal|state:opened"] button')
-    search_box_loc = page.get_by_test_id("search-input")
-    sort_filter_box_loc = page.locator('[data-bhw="sort-filter-box"]').first
-    price_range_loc = page.get_by_test_id("filter-section-price").get_by_role("textbox")
-    item_list_loc = page.get_by_test_id("deal-grid").first
+    if sort_option is not None and sort_option not in SORT_SELECTORS:
+        raise ValueError(f"Unsupported sort option: {sort_option!r}")
 
-    await page.add_locator_handler(
-        overlay_loc, lambda offer: offer.get_by_role("button").click()
+    # Locators
+    sort_filter_box_loc = page.locator(SORT_BOX_SELECTOR).first
+    price_range_loc = page.locator(PRICE_INPUT_SELECTOR)
+    # Which of grid/empty list matched is decided by the extraction script
+    results_loc = page.locator(RESULTS_SELECTOR).first
+
+    # Load the results page directly instead of rendering the homepage and
+    # submitting the search box; sort and price are still applied through
+    # the filter UI below, which needs the sort box to be there first.
+    has_filters = sort_option is not None or bool(price_min) or bool(price_max)
+    await goto_ready(
+        page,
+        build_search_url(query),
+        sort_filter_box_loc if has_filters else results_loc,
+        goto_timeout_ms,
+        goto_retries,
     )
 
-    await goto(page, "https://www.groupon.com/", goto_timeout_ms, goto_retries)
-    await search_box_loc.wait_for()
-    await search_box_loc.fill(query)
-    await search_box_loc.press("Enter")
-    await sort_filter_box_loc.wait_for()
-
-    # Set sort filter: normalize and validate before constructing locators
+    # Set sort filter (validated against SORT_SELECTORS above)
     if sort_option is not None:
-        select_sort_filter_loc = page.locator(f'[data-bhc="sort:{sort_option}"]')
+        select_sort_filter_loc = page.locator(SORT_SELECTORS[sort_option])
         await sort_filter_box_loc.click()
         await select_sort_filter_loc.click()
 
@@ -83,31 +241,11 @@ async def run(
         await price_range_loc.last.press("Tab")
 
     # Grab the first item
-    await item_list_loc.wait_for()
-    notfound = await page.locator('[data-bhw="EmptyDealList"]').count() != 0
-    if notfound:
+    await results_loc.wait_for(state="attached", timeout=READY_TIMEOUT_MS)
+    brief_info_dict = await page.evaluate(
+        EXTRACT_FIRST_DEAL_JS, [DEAL_GRID_SELECTOR, EMPTY_DEALS_SELECTOR]
+    )
+    if brief_info_dict is None or brief_info_dict.get("empty"):
         return
 
-    first_item_info = (
-        await page.get_by_test_id("deal-grid")
-        .locator("a")
-        .first.get_attribute("data-bhd")
-    ) or ""
-
-    info_dict = json.loads(first_item_info)
-    section1 = info_dict["body"]["section1"]["content"]
-    section2 = info_dict["body"]["section2"]["content"]
-    section3 = info_dict["body"]["section3"]["content"]
-    brief_info_dict = {
-        "name": section1,
-        "prices": {
-            "list_price": section2["list_price"],
-            "sell_price": section2["sell_price"],
-            "discount": section2["discount"],
-            "isocode_currency": section2["isocode_currency"],
-            "currency_exponent": section2["currency_exponent"],
-        },
-        "supplier": section3,
-    }
-
-    return brief_info_dict
+    yield brief_info_dict
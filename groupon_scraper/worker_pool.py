@@ -0,0 +1,369 @@
+"""Optional out-of-process Playwright workers.
+
+With `PLAYWRIGHT_WORKERS` > 0, scraping runs in child processes that each
+own a Playwright driver and browser (managed by `playwright_manager`). A
+worker is replaced after `WORKER_MAX_REQUESTS` jobs, which bounds memory
+held by the Python Playwright client itself; closing contexts or browsers
+cannot reclaim that. With the default of 0, scraping runs in the API
+process.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+from contextlib import asynccontextmanager
+from multiprocessing.connection import Connection
+from typing import Any, AsyncIterator, Optional
+
+from playwright.async_api import Error as PlaywrightError
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+from . import playwright_manager
+from .http_client import close_client
+from .scraper import iter_deals, run
+
+# Number of worker processes (0 scrapes in the API process)
+PLAYWRIGHT_WORKERS = max(0, int(os.getenv("PLAYWRIGHT_WORKERS", "0")))
+# Jobs a worker process serves before it is replaced
+WORKER_MAX_REQUESTS = max(1, int(os.getenv("WORKER_MAX_REQUESTS", "200")))
+# Seconds a new worker may take to launch its browser and report ready
+WORKER_START_TIMEOUT_S = 60.0
+# Seconds to wait for a worker to exit before killing it
+WORKER_STOP_TIMEOUT_S = 10.0
+# Upper bound of the exponential backoff between failed respawns (seconds)
+WORKER_RESPAWN_MAX_BACKOFF_S = 60.0
+
+logger = logging.getLogger("app.workers")
+
+# "spawn" gives each worker a fresh interpreter instead of a fork of the
+# API process with its running event loop and threads.
+_mp = multiprocessing.get_context("spawn")
+
+
+class WorkerStartError(RuntimeError):
+    """Raised when a worker process fails to start its browser."""
+
+
+class WorkerScrapeError(RuntimeError):
+    """A scrape failed inside a worker; its traceback is in the worker log."""
+
+
+class _Worker:
+    """Handle to one worker process and the parent end of its job pipe.
+
+    The worker first replies `("ready", None)` or `("failed", reason)`,
+    then one reply per job.
+    """
+
+    def __init__(self) -> None:
+        self.conn, child_conn = _mp.Pipe()
+        self.process = _mp.Process(
+            target=_worker_main, args=(child_conn,), daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        self.jobs_left = WORKER_MAX_REQUESTS
+
+    def wait_ready(self) -> None:
+        """Block until the worker reports its browser started.
+
+        Stops the worker and raises WorkerStartError if it did not.
+        """
+        try:
+            if not self.conn.poll(WORKER_START_TIMEOUT_S):
+                raise WorkerStartError("timed out waiting for worker to start")
+            status, detail = self.conn.recv()
+        except (EOFError, OSError) as e:
+            self.stop()
+            raise WorkerStartError(f"worker exited during startup: {e!r}") from e
+        except WorkerStartError:
+            self.stop()
+            raise
+        if status != "ready":
+            self.stop()
+            raise WorkerStartError(detail)
+
+    def call(self, job: dict) -> tuple[str, Any]:
+        """Send a job and block until the worker replies."""
+        self.conn.send(job)
+        return self.conn.recv()
+
+    def stop(self) -> None:
+        """Ask the worker to exit, killing it if it does not."""
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(WORKER_STOP_TIMEOUT_S)
+        if self.process.is_alive():
+            logger.warning("Killing unresponsive worker %s", self.process.pid)
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+
+# Idle workers; a worker is taken off the queue for the duration of a job
+_idle: Optional[asyncio.Queue[_Worker]] = None
+# Workers that started (idle or busy), including retired ones whose
+# replacement is starting, so a routine replacement is not an outage
+_worker_count = 0
+# In-flight exchanges, kept referenced so a cancelled request cannot drop
+# a job before the worker has replied
+_pending_jobs: set[asyncio.Task] = set()
+# Background worker replacements
+_respawn_tasks: set[asyncio.Task] = set()
+
+
+async def scrape_local(**kwargs: Any) -> dict | None:
+    """Run one scrape on a pooled page of this process's browser."""
+    async with playwright_manager.slot():
+        async with playwright_manager.page_lease() as page:
+            return await run(page=page, **kwargs)
+
+
+def _start_worker() -> _Worker:
+    """Spawn a worker and wait for its ready handshake."""
+    worker = _Worker()
+    worker.wait_ready()
+    return worker
+
+
+def _worker_main(conn: Connection) -> None:
+    """Entry point of a worker process."""
+    asyncio.run(_serve(conn))
+
+
+async def _serve(conn: Connection) -> None:
+    """Start a browser, report readiness, then serve jobs from the pipe."""
+    # Jobs arrive one at a time, so a single pooled page is enough
+    await playwright_manager.set_max(1)
+    started = False
+    try:
+        async with playwright_manager.lifespan(None):
+            started = True
+            conn.send(("ready", None))
+            await _serve_jobs(conn)
+    except Exception as e:
+        if started:
+            raise
+        # The traceback was logged by playwright_manager; tell the parent
+        conn.send(("failed", str(e)))
+
+
+async def _serve_jobs(conn: Connection) -> None:
+    loop = asyncio.get_running_loop()
+    while True:
+        try:
+            job = await loop.run_in_executor(None, conn.recv)
+        except EOFError:
+            # API process went away
+            break
+        if job is None:
+            break
+
+        try:
+            reply: tuple[str, Any] = ("ok", await scrape_local(**job))
+        except PlaywrightTimeoutError as e:
+            reply = ("timeout", str(e))
+        except playwright_manager.BrowserUnavailableError as e:
+            reply = ("unavailable", str(e))
+        except PlaywrightError as e:
+            reply = ("playwright_error", str(e))
+        except Exception as e:
+            logger.exception("Scrape failed in worker: %s", e)
+            reply = ("error", str(e))
+        conn.send(reply)
+
+
+async def _respawn(pool: asyncio.Queue[_Worker], replacing: bool = False) -> None:
+    """Start a worker for `pool`, retrying with backoff until one starts.
+
+    When `replacing`, the retired worker stays counted in `_worker_count`
+    until an attempt to start its replacement fails.
+    """
+    global _worker_count
+    loop = asyncio.get_running_loop()
+    counted = replacing
+    delay = 1.0
+    while _idle is pool:
+        try:
+            worker = await loop.run_in_executor(None, _start_worker)
+        except Exception as e:
+            if counted:
+                _worker_count -= 1
+                counted = False
+            logger.error("Failed to start worker, retrying in %.0fs: %s", delay, e)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, WORKER_RESPAWN_MAX_BACKOFF_S)
+            continue
+
+        if _idle is not pool:
+            # The pool was stopped while this worker was starting
+            await loop.run_in_executor(None, worker.stop)
+            return
+        if not counted:
+            _worker_count += 1
+        pool.put_nowait(worker)
+        return
+
+
+async def _replace(worker: _Worker, pool: asyncio.Queue[_Worker]) -> None:
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, worker.stop)
+    await _respawn(pool, replacing=True)
+
+
+def _schedule(coro) -> None:
+    task = asyncio.create_task(coro)
+    _respawn_tasks.add(task)
+    task.add_done_callback(_respawn_tasks.discard)
+
+
+async def _run_job(worker: _Worker, job: dict) -> tuple[str, Any]:
+    """Exchange one job with `worker`, then return or retire it.
+
+    Retired workers are stopped and replaced in the background, so the
+    reply is not held up by a browser launch.
+    """
+    pool = _idle
+    assert pool is not None
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(None, worker.call, job)
+    except (EOFError, OSError) as e:
+        # The worker crashed; it is replaced below
+        worker.jobs_left = 0
+        return ("unavailable", f"Worker process exited: {e!r}")
+    finally:
+        worker.jobs_left -= 1
+        if _idle is not pool:
+            # The pool was stopped while this job was running
+            await loop.run_in_executor(None, worker.stop)
+        elif worker.jobs_left <= 0:
+            _schedule(_replace(worker, pool))
+        else:
+            pool.put_nowait(worker)
+
+
+async def _scrape_remote(**kwargs: Any) -> dict | None:
+    if _idle is None:
+        raise RuntimeError("Worker pool not started")
+    worker = await _idle.get()
+    # Shield the exchange: if the request is cancelled mid-job, the worker's
+    # reply must still be read before the worker is handed to another job.
+    job = asyncio.ensure_future(_run_job(worker, kwargs))
+    _pending_jobs.add(job)
+    job.add_done_callback(_pending_jobs.discard)
+    status, payload = await asyncio.shield(job)
+
+    if status == "timeout":
+        raise PlaywrightTimeoutError(payload)
+    if status == "playwright_error":
+        raise PlaywrightError(payload)
+    if status == "unavailable":
+        raise playwright_manager.BrowserUnavailableError(payload)
+    if status == "error":
+        raise WorkerScrapeError(payload)
+    return payload
+
+
+async def scrape(**kwargs: Any) -> dict | None:
+    """Scrape with `scraper.run` arguments, in a worker if configured."""
+    if PLAYWRIGHT_WORKERS > 0:
+        return await _scrape_remote(**kwargs)
+    return await scrape_local(**kwargs)
+
+
+async def scrape_stream(**kwargs: Any) -> AsyncIterator[dict]:
+    """Yield deals as they are parsed, in a worker if configured.
+
+    In-process, the page slot is held until the generator finishes or is
+    closed. Workers reply once per job, so their result arrives as a
+    single item.
+    """
+    if PLAYWRIGHT_WORKERS > 0:
+        result = await _scrape_remote(**kwargs)
+        if result is not None:
+            yield result
+        return
+
+    async with playwright_manager.slot():
+        async with playwright_manager.page_lease() as page:
+            async for deal in iter_deals(page=page, **kwargs):
+                yield deal
+
+
+def is_available() -> bool:
+    """Whether scraping can currently be served."""
+    if PLAYWRIGHT_WORKERS > 0:
+        return _idle is not None and _worker_count > 0
+    # A routine recycle briefly has no browser; requests wait in `slot`
+    return playwright_manager.get_playwright() is not None and (
+        playwright_manager.get_browser() is not None
+        or playwright_manager.is_recycling()
+    )
+
+
+async def _start_workers() -> None:
+    """Start the worker processes; failed ones are retried in the background."""
+    global _idle, _worker_count
+    loop = asyncio.get_running_loop()
+    results = await asyncio.gather(
+        *(
+            loop.run_in_executor(None, _start_worker)
+            for _ in range(PLAYWRIGHT_WORKERS)
+        ),
+        return_exceptions=True,
+    )
+    pool: asyncio.Queue[_Worker] = asyncio.Queue()
+    _idle = pool
+    _worker_count = 0
+    for result in results:
+        if isinstance(result, _Worker):
+            _worker_count += 1
+            pool.put_nowait(result)
+        else:
+            logger.error("Failed to start worker: %s", result)
+            _schedule(_respawn(pool))
+    logger.info(
+        "Started %d of %d Playwright worker processes",
+        _worker_count,
+        PLAYWRIGHT_WORKERS,
+    )
+
+
+async def _stop_workers() -> None:
+    global _idle, _worker_count
+    if _idle is None:
+        return
+    for task in list(_respawn_tasks):
+        task.cancel()
+    loop = asyncio.get_running_loop()
+    _worker_count = 0
+    workers = []
+    while not _idle.empty():
+        workers.append(_idle.get_nowait())
+    _idle = None
+    await asyncio.gather(
+        *(loop.run_in_executor(None, worker.stop) for worker in workers)
+    )
+    logger.info("Playwright worker processes stopped")
+
+
+@asynccontextmanager
+async def lifespan(app):
+    """Start either the worker processes or the in-process browser."""
+    try:
+        if PLAYWRIGHT_WORKERS <= 0:
+            async with playwright_manager.lifespan(app):
+                yield
+            return
+
+        await _start_workers()
+        try:
+            yield
+        finally:
+            await _stop_workers()
+    finally:
+        await close_client()
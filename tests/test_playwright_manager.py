@@ -0,0 +1,81 @@
+"""Admission control in `playwright_manager.slot`.
+
+Run with `python -m unittest discover tests`.
+"""
+
+import asyncio
+import unittest
+from unittest import mock
+
+from groupon_scraper import playwright_manager
+
+
+class SlotCancellationTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        patches = [
+            mock.patch.object(playwright_manager, "_cond", asyncio.Condition()),
+            mock.patch.object(playwright_manager, "_active", 0),
+            mock.patch.object(playwright_manager, "_c_max", 1),
+            mock.patch.object(playwright_manager, "_draining", False),
+            mock.patch.object(playwright_manager, "RECYCLE_EVERY", 0),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    async def test_cancel_inside_slot_releases_it(self) -> None:
+        entered = asyncio.Event()
+
+        async def hold_slot() -> None:
+            async with playwright_manager.slot():
+                entered.set()
+                await asyncio.sleep(3600)
+
+        task = asyncio.create_task(hold_slot())
+        await entered.wait()
+
+        # Cancel while the lock is busy, repeatedly, the way an anyio
+        # cancel scope re-delivers cancellation at every await
+        async with playwright_manager._cond:
+            for _ in range(3):
+                task.cancel()
+                await asyncio.sleep(0)
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+            self.assertEqual(playwright_manager._active, 0)
+
+        async def reacquire() -> None:
+            async with playwright_manager.slot():
+                pass
+
+        await asyncio.wait_for(reacquire(), timeout=1.0)
+        self.assertEqual(playwright_manager._active, 0)
+
+    async def test_release_wakes_waiter(self) -> None:
+        release = asyncio.Event()
+        order = []
+
+        async def first() -> None:
+            async with playwright_manager.slot():
+                await release.wait()
+            order.append("first")
+
+        async def second() -> None:
+            async with playwright_manager.slot():
+                order.append("second")
+
+        first_task = asyncio.create_task(first())
+        await asyncio.sleep(0)
+        second_task = asyncio.create_task(second())
+        await asyncio.sleep(0)
+        self.assertEqual(order, [])
+
+        release.set()
+        await asyncio.wait_for(
+            asyncio.gather(first_task, second_task), timeout=1.0
+        )
+        self.assertEqual(order, ["first", "second"])
+
+
+if __name__ == "__main__":
+    unittest.main()